@@ -1,41 +1,81 @@
 ﻿import json
+import logging
+import logging.handlers
 import os
+import queue
 import socket
 import struct
 import subprocess
 import sys
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 HOST = "127.0.0.1"
 DEFAULT_PORT = 8888
+# Native messaging frames each JSON message with a little-endian uint32 length.
+_LEN = struct.Struct('<I')
 LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "host.log")
 
+logger = logging.getLogger("eyetracker_native_host")
+
+# Servers started by this host, and the ports they have been seen listening on.
+_server_procs: dict[int, subprocess.Popen] = {}
+_listening_ports: set[int] = set()
 
-def _log(message):
+
+def _start_logging():
+    # Callers only enqueue records; a listener thread owns the open log file.
     try:
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(LOG_PATH, "a", encoding="utf-8") as handle:
-            handle.write(f"[{timestamp}] {message}\n")
-    except Exception:
-        pass
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_PATH, maxBytes=1_000_000, backupCount=2, encoding="utf-8"
+        )
+    except OSError:
+        file_handler = logging.NullHandler()
+    file_handler.setFormatter(
+        logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+    )
+
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    # stdout carries the native messaging protocol; never let records reach it.
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    return listener
+
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(payload):
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    _loads = json.loads
 
 
 def _read_message():
     raw_len = sys.stdin.buffer.read(4)
     if not raw_len:
         return None
-    msg_len = struct.unpack('<I', raw_len)[0]
+    msg_len = _LEN.unpack(raw_len)[0]
     if msg_len == 0:
         return None
     data = sys.stdin.buffer.read(msg_len)
     if not data:
         return None
-    return json.loads(data.decode('utf-8'))
+    return _loads(data)
 
 
 def _send_message(payload):
-    encoded = json.dumps(payload).encode('utf-8')
-    sys.stdout.buffer.write(struct.pack('<I', len(encoded)))
+    encoded = _dumps(payload)
+    sys.stdout.buffer.write(_LEN.pack(len(encoded)))
     sys.stdout.buffer.write(encoded)
     sys.stdout.buffer.flush()
 
@@ -48,9 +88,20 @@ def _is_listening(port):
         return False
 
 
+def _server_running(port):
+    # A live child that already answered once is trusted without a TCP probe.
+    process = _server_procs.get(port)
+    if process is not None and port in _listening_ports:
+        if process.poll() is None:
+            return True
+        del _server_procs[port]
+        _listening_ports.discard(port)
+    return _is_listening(port)
+
+
 def _start_server(port, root_dir):
-    if _is_listening(port):
-        _log(f"Server already running on port {port}")
+    if _server_running(port):
+        logger.info(f"Server already running on port {port}")
         return {"ok": True, "alreadyRunning": True}
 
     cmd = [sys.executable, "-m", "http.server", str(port)]
@@ -62,37 +113,42 @@ def _start_server(port, root_dir):
     if os.name == "nt":
         kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
 
-    subprocess.Popen(cmd, **kwargs)
-    _log(f"Started server process on port {port} with {sys.executable}")
+    process = subprocess.Popen(cmd, **kwargs)
+    _server_procs[port] = process
+    logger.info(f"Started server process on port {port} with {sys.executable}")
 
     for _ in range(20):
+        if process.poll() is not None:
+            break
         if _is_listening(port):
-            _log(f"Server is listening on port {port}")
+            _listening_ports.add(port)
+            logger.info(f"Server is listening on port {port}")
             return {"ok": True, "alreadyRunning": False}
         time.sleep(0.1)
 
-    _log(f"Server failed to start on port {port}")
+    del _server_procs[port]
+    logger.info(f"Server failed to start on port {port}")
     return {"ok": False, "error": "Server did not start"}
 
 
 def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     web_dir = os.path.abspath(os.path.join(script_dir, "..", "web"))
-    _log("Native host started")
-    _log(f"Using web directory: {web_dir}")
+    logger.info("Native host started")
+    logger.info(f"Using web directory: {web_dir}")
 
     while True:
         message = _read_message()
         if message is None:
-            _log("No more messages, exiting")
+            logger.info("No more messages, exiting")
             break
 
         command = message.get("command")
         port = int(message.get("port", DEFAULT_PORT))
-        _log(f"Received command: {command} port={port}")
+        logger.info(f"Received command: {command} port={port}")
 
         if not os.path.isdir(web_dir):
-            _log("Web directory missing")
+            logger.info("Web directory missing")
             _send_message({"ok": False, "error": f"Web directory not found: {web_dir}"})
             continue
 
@@ -100,15 +156,18 @@ def main():
             response = _start_server(port, web_dir)
             _send_message(response)
         elif command == "status":
-            _send_message({"ok": True, "running": _is_listening(port)})
+            _send_message({"ok": True, "running": _server_running(port)})
         else:
-            _log(f"Unknown command: {command}")
+            logger.info(f"Unknown command: {command}")
             _send_message({"ok": False, "error": "Unknown command"})
 
 
 if __name__ == "__main__":
+    listener = _start_logging()
     try:
         main()
     except Exception as exc:
-        _log(f"Fatal error: {exc}")
+        logger.error(f"Fatal error: {exc}")
         _send_message({"ok": False, "error": str(exc)})
+    finally:
+        listener.stop()
@@ -0,0 +1,55 @@
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+ZONE_NONE = -1
+ZONE_UP = 0
+ZONE_DOWN = 1
+ZONE_RIGHT = 2
+
+
+def step(
+    ix, iy,
+    has_last, lx, ly,
+    alpha, om_alpha, outlier_sq,
+    a, b, c, d, e, f, clamp,
+    sw, sh,
+    zt, zb_thresh, zr_thresh,
+):
+    """Map, smooth and zone one raw iris point. Returns (sx, sy, zone_code)."""
+    # Affine map from camera pixels to screen pixels.
+    mx = a * ix + b * iy + c
+    my = d * ix + e * iy + f
+    if clamp:
+        mx = max(0.0, min(mx, sw))
+        my = max(0.0, min(my, sh))
+
+    # EMA with outlier rejection; an outlier keeps the previous point.
+    if not has_last:
+        sx = mx
+        sy = my
+    else:
+        dx = mx - lx
+        dy = my - ly
+        if dx * dx + dy * dy > outlier_sq:
+            sx = lx
+            sy = ly
+        else:
+            sx = alpha * mx + om_alpha * lx
+            sy = alpha * my + om_alpha * ly
+
+    if sy <= zt:
+        zone = ZONE_UP
+    elif sy >= zb_thresh:
+        zone = ZONE_DOWN
+    elif sx >= zr_thresh:
+        zone = ZONE_RIGHT
+    else:
+        zone = ZONE_NONE
+    return sx, sy, zone
+
+
+if njit is not None:
+    step = njit(cache=True, fastmath=True)(step)
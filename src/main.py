@@ -1,14 +1,21 @@
 import json
+import os
+import queue
+import threading
 import time
 from dataclasses import dataclass
 
+# Must be set before mediapipe loads its native runtime; see main().
+os.environ.setdefault("OMP_NUM_THREADS", "2")
+
 import cv2
 import mediapipe as mp
 import numpy as np
-from PyQt6 import QtWidgets
+from PyQt6 import QtCore, QtWidgets
 
 from ctypes import windll
 
+import fastgaze
 from overlay import CircularMenuOverlay
 
 
@@ -16,9 +23,20 @@ WHEEL_DELTA = 120
 VK_SHIFT = 0x10
 KEYEVENTF_KEYUP = 0x0002
 
+# Iris landmarks (left then right) from the MediaPipe face landmark model
+_IRIS_IDS = (474, 475, 476, 477, 469, 470, 471, 472)
+
+_ZONE_NAMES = {
+    fastgaze.ZONE_NONE: None,
+    fastgaze.ZONE_UP: "scroll_up",
+    fastgaze.ZONE_DOWN: "scroll_down",
+    fastgaze.ZONE_RIGHT: "scroll_right",
+}
+
 
 @dataclass
 class DwellState:
+    # Timestamps are time.monotonic() seconds.
     active_zone: str = None
     start_ts: float = 0.0
     last_fire_ts: float = 0.0
@@ -46,35 +64,75 @@ class ScrollController:
         windll.user32.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYUP, 0)
 
 
+class FrameGrabber:
+    """Reads the camera on a background thread, keeping only the latest frame."""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._frames = queue.Queue(maxsize=1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        # Only this thread touches the VideoCapture until stop() returns.
+        while not self._stop.is_set():
+            ok, frame = self.cap.read()
+            if not ok:
+                frame = None
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                pass
+            self._frames.put_nowait(frame)
+            if frame is None:
+                break
+
+    def read(self):
+        frame = self._frames.get()
+        if frame is None:
+            # Leave the end-of-stream marker for any later reader.
+            self._frames.put_nowait(None)
+            return False, None
+        return True, frame
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+
 class GazeSmoother:
+    """EMA parameters and last smoothed point, advanced by fastgaze.step."""
+
     def __init__(self, alpha, outlier_px):
         self.alpha = float(alpha)
         self.outlier_px = float(outlier_px)
+        self._one_minus_alpha = 1.0 - self.alpha
+        self._outlier_sq = self.outlier_px * self.outlier_px
         self.last = None
 
-    def update(self, point):
-        if self.last is None:
-            self.last = point
-            return point
-
-        dist = np.linalg.norm(np.array(point) - np.array(self.last))
-        if dist > self.outlier_px:
-            return self.last
-
-        smoothed = (
-            self.alpha * np.array(point) + (1.0 - self.alpha) * np.array(self.last)
-        )
-        self.last = tuple(smoothed)
-        return self.last
-
 
 class EyeTrackerController:
+    # OpenCV's pool (flip, cvtColor, resize) and MediaPipe's XNNPACK threads
+    # share the same cores. main() caps OpenCV so inference is not starved by
+    # context switches on typical 4-core laptops.
     def __init__(self, config):
         self.config = config
         self.screen_w = config["screen"]["width"]
         self.screen_h = config["screen"]["height"]
         self.dwell_cfg = config["dwell"]
         self.zones = config["zones"]
+        self._dwell_threshold_s = self.dwell_cfg["threshold_ms"] / 1000.0
+        self._dwell_cooldown_s = self.dwell_cfg["cooldown_ms"] / 1000.0
+        # Floats throughout so fastgaze.step compiles a single signature.
+        self._screen_wf = float(self.screen_w)
+        self._screen_hf = float(self.screen_h)
+        self._zone_top = float(self.zones["top_px"])
+        self._zone_bottom_thresh = float(self.screen_h - self.zones["bottom_px"])
+        self._zone_right_thresh = float(self.screen_w - self.zones["right_px"])
         self.scroll = ScrollController(
             config["scroll"]["amount"], config["scroll"]["interval_ms"]
         )
@@ -85,62 +143,123 @@ class EyeTrackerController:
         self.enabled = True
         self.menu_dwell = DwellState()
         self.show_preview = bool(config.get("show_preview", False))
+        self.process_scale = float(config["process"]["scale"])
+        # Reused per-frame buffers, allocated once the frame size is known.
+        self._flip_buf = None
+        self._rgb_buf = None
+        # Written by the landmarker callback thread, read by the frame loop.
+        self._latest_landmarks = None
+        self._last_detect_ms = -1
+        # Set by run() for the Qt-driven frame loop.
+        self._app = None
+        self._timer = None
+        self._frames = None
+        self._overlay = None
 
         self.calibration = config.get("calibration", {})
         self.calibration_matrix = self.calibration.get("matrix")
+        self._calib_coeffs = None
+        if self.calibration_matrix:
+            # Flatten the stored 2x3 affine once so the per-frame transform is scalar.
+            self._calib_coeffs = tuple(
+                float(v) for row in self.calibration_matrix for v in row
+            )
 
-        if not hasattr(mp, "solutions"):
+        model_path = config["model_path"]
+        if not os.path.isfile(model_path):
             raise RuntimeError(
-                "MediaPipe 'solutions' not available. Reinstall with mediapipe==0.10.9."
+                f"Face landmarker model not found: {model_path}. See README for the download link."
             )
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.6,
+        vision = mp.tasks.vision
+        options = vision.FaceLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(
+                model_asset_path=model_path,
+                delegate=mp.tasks.BaseOptions.Delegate.CPU,
+            ),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_faces=1,
+            min_face_detection_confidence=0.6,
+            min_face_presence_confidence=0.6,
             min_tracking_confidence=0.6,
+            result_callback=self._on_landmarks,
         )
+        self.face_landmarker = vision.FaceLandmarker.create_from_options(options)
+
+        # Pay the JIT compile (or cache load) before the camera loop starts.
+        fastgaze.step(
+            0.0, 0.0, False, 0.0, 0.0, 0.5, 0.5, 1.0,
+            1.0, 0.0, 0.0, 0.0, 1.0, 0.0, False,
+            1.0, 1.0, 0.0, 1.0, 1.0,
+        )
+
+    def _ensure_buffers(self, frame):
+        if self._flip_buf is None or self._flip_buf.shape != frame.shape:
+            self._flip_buf = np.empty_like(frame)
+            self._rgb_buf = np.empty_like(frame)
+
+    def _on_landmarks(self, result, _image, _timestamp_ms):
+        if result.face_landmarks:
+            self._latest_landmarks = result.face_landmarks[0]
+        else:
+            self._latest_landmarks = None
+
+    def _detect(self, rgb, now):
+        """Queue a frame for async detection and return the latest landmarks."""
+        # Landmarks come back normalized to [0, 1], so a downscaled input
+        # still maps onto full-resolution pixel coordinates.
+        if self.process_scale != 1.0:
+            rgb = cv2.resize(
+                rgb,
+                None,
+                fx=self.process_scale,
+                fy=self.process_scale,
+                interpolation=cv2.INTER_AREA,
+            )
+        # mp.Image copies the pixels, so the RGB buffer can be reused at once.
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+        # LIVE_STREAM requires strictly increasing timestamps.
+        timestamp_ms = max(int(now * 1000), self._last_detect_ms + 1)
+        self._last_detect_ms = timestamp_ms
+        self.face_landmarker.detect_async(image, timestamp_ms)
+        return self._latest_landmarks
 
     def _compute_iris_center(self, landmarks, image_w, image_h):
-        # Iris landmarks (left and right) from MediaPipe Face Mesh
-        left_ids = [474, 475, 476, 477]
-        right_ids = [469, 470, 471, 472]
-
-        def center(ids):
-            pts = [landmarks[i] for i in ids]
-            xs = [p.x * image_w for p in pts]
-            ys = [p.y * image_h for p in pts]
-            return (sum(xs) / len(xs), sum(ys) / len(ys))
-
-        left = center(left_ids)
-        right = center(right_ids)
-        return ((left[0] + right[0]) / 2.0, (left[1] + right[1]) / 2.0)
-
-    def _map_to_screen(self, gaze_xy, frame_w, frame_h):
-        if self.calibration_matrix is not None:
-            x, y = gaze_xy
-            vec = np.array([x, y, 1.0])
-            mapped = np.dot(self.calibration_matrix, vec)
-            return (float(mapped[0]), float(mapped[1]))
-
-        # Simple normalization to screen size if not calibrated.
-        x = np.clip(gaze_xy[0] / frame_w, 0.0, 1.0)
-        y = np.clip(gaze_xy[1] / frame_h, 0.0, 1.0)
-        return (x * self.screen_w, y * self.screen_h)
-
-    def _zone_for_point(self, x, y):
-        if y <= self.zones["top_px"]:
-            return "scroll_up"
-        if y >= self.screen_h - self.zones["bottom_px"]:
-            return "scroll_down"
-        if x >= self.screen_w - self.zones["right_px"]:
-            return "scroll_right"
-        return None
+        # Mean of both irises equals the mean of all eight landmarks.
+        sx = sy = 0.0
+        for i in _IRIS_IDS:
+            p = landmarks[i]
+            sx += p.x
+            sy += p.y
+        return (sx * image_w * 0.125, sy * image_h * 0.125)
+
+    def _gaze_step(self, iris_xy, frame_w, frame_h):
+        """Map, smooth and zone an iris point in one fastgaze.step call."""
+        ix, iy = iris_xy
+        if self._calib_coeffs is not None:
+            a, b, c, d, e, f = self._calib_coeffs
+            clamp = False
+        else:
+            # Simple normalization to screen size if not calibrated.
+            a, b, c = self._screen_wf / frame_w, 0.0, 0.0
+            d, e, f = 0.0, self._screen_hf / frame_h, 0.0
+            clamp = True
+
+        smoother = self.smoother
+        last = smoother.last
+        has_last = last is not None
+        lx, ly = last if has_last else (0.0, 0.0)
+        sx, sy, zone_code = fastgaze.step(
+            ix, iy,
+            has_last, lx, ly,
+            smoother.alpha, smoother._one_minus_alpha, smoother._outlier_sq,
+            a, b, c, d, e, f, clamp,
+            self._screen_wf, self._screen_hf,
+            self._zone_top, self._zone_bottom_thresh, self._zone_right_thresh,
+        )
+        smoother.last = (sx, sy)
+        return sx, sy, _ZONE_NAMES[zone_code]
 
     def _process_dwell(self, zone, now):
-        threshold = self.dwell_cfg["threshold_ms"] / 1000.0
-        cooldown = self.dwell_cfg["cooldown_ms"] / 1000.0
-
         if zone != self.dwell.active_zone:
             self.dwell.active_zone = zone
             self.dwell.start_ts = now
@@ -149,10 +268,10 @@ class EyeTrackerController:
         if zone is None:
             return
 
-        if now - self.dwell.last_fire_ts < cooldown:
+        if now - self.dwell.last_fire_ts < self._dwell_cooldown_s:
             return
 
-        if now - self.dwell.start_ts >= threshold:
+        if now - self.dwell.start_ts >= self._dwell_threshold_s:
             self.dwell.last_fire_ts = now
             if zone == "scroll_up":
                 self.scroll.scroll_up()
@@ -162,14 +281,13 @@ class EyeTrackerController:
                 self.scroll.scroll_right()
 
     def _process_menu_dwell(self, action, now):
-        threshold = self.dwell_cfg["threshold_ms"] / 1000.0
         if action != self.menu_dwell.active_zone:
             self.menu_dwell.active_zone = action
             self.menu_dwell.start_ts = now
             return False
         if action is None:
             return False
-        if now - self.menu_dwell.start_ts >= threshold:
+        if now - self.menu_dwell.start_ts >= self._dwell_threshold_s:
             self.menu_dwell.active_zone = None
             return True
         return False
@@ -180,8 +298,9 @@ class EyeTrackerController:
         with open("config.json", "w", encoding="ascii") as f:
             json.dump(self.config, f, indent=2)
         self.calibration_matrix = matrix
+        self._calib_coeffs = tuple(matrix.ravel().tolist())
 
-    def run_calibration(self, cap):
+    def run_calibration(self, frames):
         points = [
             (0.5, 0.5),
             (0.1, 0.1),
@@ -195,10 +314,12 @@ class EyeTrackerController:
         for nx, ny in points:
             dwell_start = None
             while True:
-                ok, frame = cap.read()
+                ok, frame = frames.read()
                 if not ok:
                     return
-                frame = cv2.flip(frame, 1)
+                now = time.monotonic()
+                self._ensure_buffers(frame)
+                frame = cv2.flip(frame, 1, dst=self._flip_buf)
                 h, w, _ = frame.shape
                 cx = int(nx * w)
                 cy = int(ny * h)
@@ -214,18 +335,17 @@ class EyeTrackerController:
                 )
                 cv2.imshow("calibration", frame)
                 _ = cv2.waitKey(1)
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = self.face_mesh.process(rgb)
-                if result.multi_face_landmarks:
-                    landmarks = result.multi_face_landmarks[0].landmark
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+                landmarks = self._detect(rgb, now)
+                if landmarks is not None:
                     iris_xy = self._compute_iris_center(landmarks, w, h)
                     # Check dwell near the target dot
                     dx = abs(iris_xy[0] - cx)
                     dy = abs(iris_xy[1] - cy)
                     if dx <= 40 and dy <= 40:
                         if dwell_start is None:
-                            dwell_start = time.time()
-                        elif time.time() - dwell_start >= 0.6:
+                            dwell_start = now
+                        elif now - dwell_start >= 0.6:
                             samples.append([iris_xy[0], iris_xy[1], 1.0])
                             targets.append([nx * self.screen_w, ny * self.screen_h])
                             break
@@ -237,71 +357,108 @@ class EyeTrackerController:
         A = np.array(samples)
         B = np.array(targets)
         if len(A) >= 3:
-            matrix, _, _, _ = np.linalg.lstsq(A, B, rcond=None)
+            # 3x3 normal equations are cheaper than lstsq for a 2x3 affine;
+            # fall back to lstsq when the samples are degenerate.
+            try:
+                matrix = np.linalg.solve(A.T @ A, A.T @ B)
+            except np.linalg.LinAlgError:
+                matrix, _, _, _ = np.linalg.lstsq(A, B, rcond=None)
             self._save_calibration(matrix.T)
 
     def run(self):
-        cap = cv2.VideoCapture(self.config["camera_index"])
+        cap = cv2.VideoCapture(self.config["camera_index"], cv2.CAP_DSHOW)
         if not cap.isOpened():
             raise RuntimeError("Camera not accessible")
+        # MJPG at a modest resolution keeps USB transfer and decode cheap.
+        capture_cfg = self.config["capture"]
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture_cfg["width"])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_cfg["height"])
+        cap.set(cv2.CAP_PROP_FPS, capture_cfg["fps"])
+        print(
+            "Camera negotiated "
+            f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+            f"{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+            f"@ {cap.get(cv2.CAP_PROP_FPS):.0f} fps"
+        )
+        frames = FrameGrabber(cap).start()
 
         if self.calibration.get("enabled") and not self.calibration_matrix:
-            self.run_calibration(cap)
+            self.run_calibration(frames)
 
         app = QtWidgets.QApplication.instance()
         if app is None:
             app = QtWidgets.QApplication([])
-        overlay = CircularMenuOverlay()
-        overlay.show()
+        self._app = app
+        self._frames = frames
+        self._overlay = CircularMenuOverlay()
+        self._overlay.show()
+
+        # Qt owns scheduling: a zero-interval timer runs one frame per idle pass.
+        self._timer = QtCore.QTimer()
+        self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._tick)
+        self._timer.start()
+        app.exec()
+
+        frames.stop()
+        cap.release()
+        self.face_landmarker.close()
+        if self.show_preview:
+            cv2.destroyAllWindows()
 
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                break
+    def stop(self):
+        self._timer.stop()
+        self._app.quit()
+
+    def _tick(self):
+        ok, frame = self._frames.read()
+        if not ok:
+            self.stop()
+            return
+        now = time.monotonic()
+        overlay = self._overlay
+
+        self._ensure_buffers(frame)
+        frame = cv2.flip(frame, 1, dst=self._flip_buf)
+        h, w, _ = frame.shape
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        landmarks = self._detect(rgb, now)
+
+        if landmarks is not None:
+            iris_xy = self._compute_iris_center(landmarks, w, h)
+            sx, sy, zone = self._gaze_step(iris_xy, w, h)
+            # np.float64 subclasses float, so check the exact type (stripped by -O).
+            assert type(sx) is float and type(sy) is float, (type(sx), type(sy))
+
+            if overlay.is_in_base_circle(sx, sy):
+                overlay.toggle_expand(True)
+
+            action = overlay.action_at(sx, sy)
+            overlay.set_hover_action(action)
+            if self._process_menu_dwell(action, now):
+                if action == "pause":
+                    self.enabled = False
+                elif action == "resume":
+                    self.enabled = True
+                elif action == "recalibrate":
+                    self.run_calibration(self._frames)
+                elif action == "exit":
+                    self.stop()
+                    return
 
-            frame = cv2.flip(frame, 1)
-            h, w, _ = frame.shape
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            result = self.face_mesh.process(rgb)
-
-            if result.multi_face_landmarks:
-                landmarks = result.multi_face_landmarks[0].landmark
-                iris_xy = self._compute_iris_center(landmarks, w, h)
-                screen_xy = self._map_to_screen(iris_xy, w, h)
-                screen_xy = self.smoother.update(screen_xy)
-
-                if overlay.is_in_base_circle(screen_xy[0], screen_xy[1]):
-                    overlay.toggle_expand(True)
-
-                action = overlay.action_at(screen_xy[0], screen_xy[1])
-                overlay.set_hover_action(action)
-                if self._process_menu_dwell(action, time.time()):
-                    if action == "pause":
-                        self.enabled = False
-                    elif action == "resume":
-                        self.enabled = True
-                    elif action == "recalibrate":
-                        self.run_calibration(cap)
-                    elif action == "exit":
-                        break
-
-                if self.enabled:
-                    zone = self._zone_for_point(screen_xy[0], screen_xy[1])
-                    self._process_dwell(zone, time.time())
-
-            if self.show_preview:
-                if result.multi_face_landmarks:
-                    x = int(np.clip(screen_xy[0], 0, self.screen_w - 1) / self.screen_w * w)
-                    y = int(np.clip(screen_xy[1], 0, self.screen_h - 1) / self.screen_h * h)
-                    cv2.circle(frame, (x, y), 6, (0, 0, 255), -1)
-                cv2.imshow("eye-tracker", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-            app.processEvents()
+            if self.enabled:
+                self._process_dwell(zone, now)
 
-        cap.release()
         if self.show_preview:
-            cv2.destroyAllWindows()
+            if landmarks is not None:
+                x = int(max(0, min(sx, self.screen_w - 1)) / self.screen_w * w)
+                y = int(max(0, min(sy, self.screen_h - 1)) / self.screen_h * h)
+                cv2.circle(frame, (x, y), 6, (0, 0, 255), -1)
+            cv2.imshow("eye-tracker", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                self.stop()
 
 
 def load_config(path="config.json"):
@@ -312,11 +469,19 @@ def load_config(path="config.json"):
     if not config["screen"].get("width") or not config["screen"].get("height"):
         config["screen"]["width"] = int(windll.user32.GetSystemMetrics(0))
         config["screen"]["height"] = int(windll.user32.GetSystemMetrics(1))
+    config.setdefault("model_path", "models/face_landmarker.task")
+    config.setdefault("threads", {}).setdefault("opencv", 2)
+    config.setdefault("process", {}).setdefault("scale", 0.5)
+    capture = config.setdefault("capture", {})
+    capture.setdefault("width", 640)
+    capture.setdefault("height", 480)
+    capture.setdefault("fps", 30)
     return config
 
 
 def main():
     config = load_config()
+    cv2.setNumThreads(int(config["threads"]["opencv"]))
     controller = EyeTrackerController(config)
     controller.run()
 
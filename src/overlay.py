@@ -1,4 +1,6 @@
+import math
 import sys
+
 from PyQt6 import QtCore, QtGui, QtWidgets
 
 
@@ -9,9 +11,13 @@ class CircularMenuOverlay(QtWidgets.QWidget):
 
     def __init__(self, radius=28, parent=None):
         super().__init__(parent)
-        self.radius = radius
+        self._radius = radius
+        self._radius_sq = radius * radius
+        self._hit_radius_sq = 20 * 20  # action dot radius, squared
+        self._actions = ["pause", "resume", "recalibrate", "exit"]
+        self._ring_offsets: list[tuple[float, float]] = []
+        self._rebuild_ring()
         self.expanded = False
-        self.actions = ["pause", "resume", "recalibrate", "exit"]
         self.hover_action = None
 
         self.setWindowFlags(
@@ -26,6 +32,36 @@ class CircularMenuOverlay(QtWidgets.QWidget):
         screen = QtGui.QGuiApplication.primaryScreen().geometry()
         self.move(screen.width() - self.width() - 20, (screen.height() - self.height()) // 2)
 
+    @property
+    def radius(self):
+        return self._radius
+
+    @radius.setter
+    def radius(self, value):
+        self._radius = value
+        self._radius_sq = value * value
+        self._rebuild_ring()
+
+    @property
+    def actions(self):
+        return self._actions
+
+    @actions.setter
+    def actions(self, value):
+        self._actions = list(value)
+        self._rebuild_ring()
+
+    def _rebuild_ring(self):
+        # Action dot offsets from the widget center, shared by hit-test and paint.
+        ring_radius = self._radius + 36
+        angle_step = 360 / max(1, len(self._actions))
+        self._ring_offsets = []
+        for i in range(len(self._actions)):
+            radians = math.radians(i * angle_step - 90)
+            self._ring_offsets.append(
+                (ring_radius * math.cos(radians), ring_radius * math.sin(radians))
+            )
+
     def screen_center(self):
         pos = self.pos()
         return (pos.x() + self.width() / 2, pos.y() + self.height() / 2)
@@ -34,27 +70,26 @@ class CircularMenuOverlay(QtWidgets.QWidget):
         if not self.expanded:
             return None
         cx, cy = self.screen_center()
-        ring_radius = self.radius + 36
-        angle_step = 360 / max(1, len(self.actions))
-        for i, action in enumerate(self.actions):
-            angle_deg = i * angle_step - 90
-            radians = angle_deg * 3.14159 / 180.0
-            x = cx + ring_radius * QtCore.qCos(radians)
-            y = cy + ring_radius * QtCore.qSin(radians)
-            if (screen_x - x) ** 2 + (screen_y - y) ** 2 <= 20 ** 2:
+        dx0 = screen_x - cx
+        dy0 = screen_y - cy
+        for action, (ox, oy) in zip(self._actions, self._ring_offsets):
+            dx = dx0 - ox
+            dy = dy0 - oy
+            if dx * dx + dy * dy <= self._hit_radius_sq:
                 return action
         return None
 
     def is_in_base_circle(self, screen_x, screen_y):
         cx, cy = self.screen_center()
-        return (screen_x - cx) ** 2 + (screen_y - cy) ** 2 <= self.radius ** 2
+        dx = screen_x - cx
+        dy = screen_y - cy
+        return dx * dx + dy * dy <= self._radius_sq
 
     def toggle_expand(self, expand=None):
-        if expand is None:
-            self.expanded = not self.expanded
-        else:
-            self.expanded = bool(expand)
-        self.update()
+        expanded = not self.expanded if expand is None else bool(expand)
+        if self.expanded != expanded:
+            self.expanded = expanded
+            self.update()
 
     def set_hover_action(self, action_name):
         if self.hover_action != action_name:
@@ -78,13 +113,9 @@ class CircularMenuOverlay(QtWidgets.QWidget):
             return
 
         # Expanded action rings
-        ring_radius = self.radius + 36
-        angle_step = 360 / max(1, len(self.actions))
-        for i, action in enumerate(self.actions):
-            angle_deg = i * angle_step - 90
-            radians = angle_deg * 3.14159 / 180.0
-            x = center.x() + ring_radius * QtCore.qCos(radians)
-            y = center.y() + ring_radius * QtCore.qSin(radians)
+        for action, (ox, oy) in zip(self._actions, self._ring_offsets):
+            x = center.x() + ox
+            y = center.y() + oy
 
             action_color = highlight if action == self.hover_action else base_color
             painter.setBrush(QtGui.QBrush(action_color))